@@ -1,41 +1,73 @@
 #!/usr/bin/env python3
 import json, re, subprocess, time, argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from portal_scheduler import AdaptiveScheduler, CircuitOpen
 
 def slug(s): return re.sub(r'[^a-z0-9]+','_', s.lower()).strip('_')
 def acad_label(y: int) -> str:
     return f"{y-1}-{str(y)[-2:]}"  # 2024 -> "2023-24"
 
+def curl_fetch(url: str, fp: Path, max_time: float):
+    # Headers go to stdout (-D -) followed by the final status code (-w), so we can see 429/5xx + Retry-After.
+    r = subprocess.run(["curl","-sSL","--max-time",str(max_time),"-D","-","-o",str(fp),"-w","%{http_code}", url],
+                       capture_output=True, text=True)
+    lines = r.stdout.strip().splitlines()
+    code = lines[-1].strip() if lines else ""
+    status = int(code) if code.isdigit() and code != "000" else None
+    retry_after = None
+    for ln in lines[:-1]:
+        if ln.startswith("HTTP/"):
+            retry_after = None  # new response in a redirect chain; only the final one counts
+        elif ln.lower().startswith("retry-after:"):
+            retry_after = ln.split(":", 1)[1].strip()
+    if r.returncode != 0:
+        status = None  # transfer broke (reset, truncated body, --max-time) even if headers said 200
+    if status is None or status >= 400:
+        fp.unlink(missing_ok=True)
+    return status, retry_after
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--ids", default="out/district_ids.json")
     ap.add_argument("--year", type=int, required=True, help="Column year (e.g., 2024 for 2023-24)")
     ap.add_argument("--outdir", default="downloads")
-    ap.add_argument("--sleep", type=float, default=0.5)
+    ap.add_argument("--sleep", type=float, default=0.5, help="Minimum gap between request starts (seconds)")
+    ap.add_argument("--workers", type=int, default=4, help="Max concurrent fetches; the scheduler ramps up to this")
+    ap.add_argument("--retries", type=int, default=3)
+    ap.add_argument("--max-time", type=float, default=60.0, help="Per-transfer timeout passed to curl (seconds)")
     args = ap.parse_args()
 
     label = acad_label(args.year)
     outdir = Path(args.outdir) / str(args.year)
     outdir.mkdir(parents=True, exist_ok=True)
+    sched = AdaptiveScheduler(min_interval=args.sleep, max_concurrency=args.workers)
 
     ids = json.load(open(args.ids, 'r', encoding='utf-8'))
-    ok = fail = 0
-    for d in ids:
+
+    def fetch(d):
         did = str(d["district_id"])
         name = d.get("district_name", f"district_{did}")
         url = f"https://nevadareportcard.nv.gov/DI/nspf/{did}/{args.year}/statedistrict"
         fp = outdir / f"SchoolRatings_{label}_{did}_{slug(name)}.csv"
-        print(f"Fetching {did} {name} -> {fp.name}")
-        r = subprocess.run(["curl","-fsSL","--retry","3","--retry-delay","1", url, "-o", str(fp)])
-        if r.returncode == 0 and fp.exists() and fp.stat().st_size > 0:
-            print(f"  Saved ({fp.stat().st_size:,} bytes)")
-            ok += 1
-        else:
-            print(f"  FAIL")
-            fail += 1
-        time.sleep(args.sleep)
-
-    print(f"\nDone. OK={ok}, FAIL={fail}. Files in {outdir}")
+        try:
+            status = sched.call(lambda: curl_fetch(url, fp, args.max_time), retries=args.retries)
+        except CircuitOpen as e:
+            print(f"Fetching {did} {name} -> {fp.name}\n  SKIP ({e})")
+            return False
+        if status is not None and status < 400 and fp.exists() and fp.stat().st_size > 0:
+            print(f"Fetching {did} {name} -> {fp.name}\n  Saved ({fp.stat().st_size:,} bytes)")
+            return True
+        print(f"Fetching {did} {name} -> {fp.name}\n  FAIL (status={status})")
+        return False
+
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        results = list(pool.map(fetch, ids))
+    ok = sum(results); fail = len(results) - ok
+
+    print(f"\nDone. OK={ok}, FAIL={fail}. Files in {outdir}  ({time.monotonic() - t0:.1f}s)")
+    print(f"Scheduler: {sched.summary()}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Stream the Validation Day enrollment workbook into a flat school-level preview CSV.
+
+Reads data/enrollment/<label>.xlsx with openpyxl in read-only mode, touches only
+the "School Level Totals" sheet, and writes data/enrollment/<label>_preview.csv
+row by row, with two key columns ahead of the source columns, normalised to
+match the ratings masters:
+  district_code  LEA code digits, leading zeros stripped   ("02"      -> "2")
+  school_code    leading zeros stripped from the integer part, decimal suffix
+                 kept verbatim                              ("01205.1" -> "1205.1")
+Column order follows schema/<label>/enrollment_preview_headers.json when that
+snapshot exists.
+
+Parsed previews are cached under out/cache/enrollment/ keyed by the workbook's
+SHA256 together with the year label, the resolved column list and ENGINE_VERSION,
+so an unchanged workbook is never parsed twice for the same output.
+
+Usage:
+  python make_enrollment_preview.py --year 2025
+  # -> data/enrollment/2024-25_preview.csv
+"""
+import argparse, csv, hashlib, json, re, shutil
+from pathlib import Path
+
+SHEET_NAME = "School Level Totals"
+KEY_COLS = ["district_code", "school_code"]
+ENGINE_VERSION = 2  # bump when parsing/normalisation changes to invalidate caches
+
+def acad_label(y: int) -> str:
+    return f"{y-1}-{str(y)[-2:]}"
+
+def sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1<<20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cell_text(v) -> str:
+    """Render a cell without float noise: 2060.0 -> '2060', 1301.2 -> '1301.2'."""
+    if v is None:
+        return ""
+    if isinstance(v, float):
+        return str(int(v)) if v.is_integer() else repr(v)
+    return str(v).strip()
+
+def norm_school_code(code: str) -> str:
+    """'01205.1' -> '1205.1'; the decimal suffix (ES/MS/HS band) is kept as-is."""
+    m = re.fullmatch(r"(\d+)(\.\d+)?", code)
+    if not m:
+        return code
+    return (m.group(1).lstrip("0") or "0") + (m.group(2) or "")
+
+def norm_header(v) -> str:
+    return re.sub(r"\s+", " ", cell_text(v))
+
+def find_sheet(wb):
+    for name in wb.sheetnames:
+        if name.strip().lower() == SHEET_NAME.lower():
+            return wb[name]
+    for name in wb.sheetnames:
+        if SHEET_NAME.lower() in name.lower():
+            return wb[name]
+    raise SystemExit(f"No '{SHEET_NAME}' sheet in workbook (sheets: {', '.join(wb.sheetnames)})")
+
+def expected_columns(root: Path, label: str):
+    snap = root / "schema" / label / "enrollment_preview_headers.json"
+    if snap.exists():
+        return json.loads(snap.read_text(encoding="utf-8"))["columns"]
+    return None
+
+def stream_preview(xlsx: Path, out_csv: Path, columns=None) -> int:
+    from openpyxl import load_workbook  # optional dependency, only needed for this stage
+
+    wb = load_workbook(xlsx, read_only=True, data_only=True)
+    try:
+        rows = find_sheet(wb).iter_rows(values_only=True)
+        # Title/notes rows sit above the real header; the header is the first row naming "School Code".
+        header = None
+        for row in rows:
+            names = [norm_header(v) for v in row]
+            if "School Code" in names:
+                header = names
+                break
+        if header is None:
+            raise SystemExit(f"No header row with 'School Code' in '{SHEET_NAME}' of {xlsx.name}")
+        src = {}
+        for i, name in enumerate(header):
+            if name:
+                src.setdefault(name, i)  # first occurrence wins on duplicate headers
+        lea_col = next((n for n in ("Local Education Agency Code", "District Code") if n in src), None)
+        if lea_col is None:
+            raise SystemExit(f"No LEA/district code column in '{SHEET_NAME}' of {xlsx.name}")
+        cols = columns or KEY_COLS + [n for n in header if n]
+        missing = [c for c in cols if c not in KEY_COLS and c not in src]
+        if missing:
+            print(f"[WARN] columns missing from workbook (left blank): {', '.join(missing)}")
+
+        out_csv.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out_csv.with_suffix(".csv.tmp")
+        n = 0
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(cols)
+            sc, lc = src["School Code"], src[lea_col]
+            for row in rows:
+                school = cell_text(row[sc]) if sc < len(row) else ""
+                lea = cell_text(row[lc]) if lc < len(row) else ""
+                if not school or not re.search(r"\d", school):
+                    continue  # blank spacer / subtotal / footnote rows
+                dcode = re.sub(r"[^\d]", "", lea)
+                rec = {"district_code": (dcode.lstrip("0") or "0") if dcode else "", "school_code": norm_school_code(school)}
+                w.writerow([rec[c] if c in rec else
+                            (cell_text(row[src[c]]) if c in src and src[c] < len(row) else "")
+                            for c in cols])
+                n += 1
+        tmp.replace(out_csv)
+        return n
+    finally:
+        wb.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--year", type=int, required=True, help="Column year (e.g., 2025 for 2024-25)")
+    ap.add_argument("--xlsx", help="Workbook path (default: data/enrollment/<label>.xlsx)")
+    ap.add_argument("--out", help="Preview CSV (default: data/enrollment/<label>_preview.csv)")
+    ap.add_argument("--cache-dir", default="out/cache/enrollment")
+    ap.add_argument("--force", action="store_true", help="Re-parse even if cached")
+    args = ap.parse_args()
+
+    root = Path(__file__).resolve().parent
+    label = acad_label(args.year)
+    xlsx = Path(args.xlsx) if args.xlsx else root / "data" / "enrollment" / f"{label}.xlsx"
+    out_csv = Path(args.out) if args.out else root / "data" / "enrollment" / f"{label}_preview.csv"
+    if not xlsx.exists():
+        raise SystemExit(f"Workbook not found: {xlsx}")
+
+    columns = expected_columns(root, label)
+    fingerprint = json.dumps({"v": ENGINE_VERSION, "label": label, "xlsx": sha256(xlsx), "columns": columns})
+    cache = Path(args.cache_dir) / f"{hashlib.sha256(fingerprint.encode()).hexdigest()}.csv"
+    if cache.exists() and not args.force:
+        out_csv.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(cache, out_csv)
+        print(f"Wrote {out_csv} (cached: {cache.name[:16]}…)")
+        return
+
+    n = stream_preview(xlsx, out_csv, columns)
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(out_csv, cache)
+    print(f"Wrote {out_csv}  ({n} schools)")
+
+if __name__ == "__main__":
+    main()
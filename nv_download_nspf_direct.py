@@ -5,10 +5,11 @@ Headless by default. Replace BASE_URL and SELECTOR_PATTERNS to match your site.
 """
 
 from __future__ import annotations
-import argparse, json, sys, time
+import argparse, json, sys
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
-from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
+from playwright.sync_api import sync_playwright, Error as PWError, TimeoutError as PWTimeout
+from portal_scheduler import AdaptiveScheduler, CircuitOpen
 
 # ===== CONFIG: EDIT THESE FOR YOUR SITE =====
 BASE_URL = "https://example.com/nspf"  # TODO: set the real page URL
@@ -20,6 +21,7 @@ SELECTOR_PATTERNS: List[str] = [
 CLICK_TIMEOUT_MS = 15_000
 DOWNLOAD_TIMEOUT_MS = 60_000
 RETRIES = 3
+MIN_INTERVAL_S = 1.2   # floor between page loads; the scheduler backs off from here
 # ===== END CONFIG =====
 
 def parse_args() -> argparse.Namespace:
@@ -82,15 +84,24 @@ def first_present_selector(page, idv: str, name: str, year: int) -> Optional[str
             continue
     return None
 
-def download_one(page, outdir: Path, idv: str, name: str, year: int) -> Dict[str, Any]:
-    attempt, last_err = 0, None
-    while attempt < RETRIES:
-        attempt += 1
+def download_one(page, sched: AdaptiveScheduler, outdir: Path, idv: str, name: str, year: int) -> Dict[str, Any]:
+    state: Dict[str, Any] = {"attempts": 0, "last_err": None, "row": None}
+
+    def attempt() -> Tuple[Optional[int], Optional[str]]:
+        state["attempts"] += 1
         try:
             page.goto(BASE_URL, wait_until="domcontentloaded", timeout=CLICK_TIMEOUT_MS)
+        except PWTimeout as e:
+            state["last_err"] = f"timeout: {e}"
+            return None, None   # portal not answering: hard failure, feeds the breaker
+        except PWError as e:
+            state["last_err"] = str(e)
+            return None, None   # net::ERR_* and friends
+        try:
             sel = first_present_selector(page, idv, name, year)
             if not sel:
-                raise RuntimeError(f"No selector matched for id={idv}, name={name}, year={year}")
+                state["last_err"] = f"No selector matched for id={idv}, name={name}, year={year}"
+                return 408, None    # links may still be rendering: reload and retry
             with page.expect_download(timeout=DOWNLOAD_TIMEOUT_MS) as dl_info:
                 page.locator(sel).first.click(timeout=CLICK_TIMEOUT_MS)
             download = dl_info.value
@@ -99,28 +110,23 @@ def download_one(page, outdir: Path, idv: str, name: str, year: int) -> Dict[str
             fname = f"{idv}_{slug(name)}_{year}{ext}"
             target = outdir / fname
             download.save_as(target)
-            return {
-                "district_id": idv,
-                "district_name": name,
-                "year": year,
-                "status": "ok",
-                "filename": str(target),
-                "suggested_filename": suggested,
-                "attempts": attempt,
-            }
+            state["row"] = {"filename": str(target), "suggested_filename": suggested}
+            return 200, None
         except PWTimeout as e:
-            last_err = f"timeout: {e}"
+            state["last_err"] = f"timeout: {e}"
         except Exception as e:
-            last_err = str(e)
-        time.sleep(1.2)
-    return {
-        "district_id": idv,
-        "district_name": name,
-        "year": year,
-        "status": "error",
-        "error": last_err or "unknown",
-        "attempts": attempt,
-    }
+            state["last_err"] = str(e)
+        # Click/download hiccup on a page that did load: retry, but don't blame the portal.
+        return 408, None
+
+    try:
+        sched.call(attempt, retries=RETRIES)
+    except CircuitOpen as e:
+        state["last_err"] = str(e)
+    base = {"district_id": idv, "district_name": name, "year": year}
+    if state["row"]:
+        return {**base, "status": "ok", **state["row"], "attempts": state["attempts"]}
+    return {**base, "status": "error", "error": state["last_err"] or "unknown", "attempts": state["attempts"]}
 
 def main():
     args = parse_args()
@@ -128,6 +134,8 @@ def main():
     outdir = Path(args.outdir); outdir.mkdir(parents=True, exist_ok=True)
     Path("out").mkdir(exist_ok=True)
     manifest: List[Dict[str, Any]] = []
+    # One browser page -> one request at a time; the scheduler still adapts pacing/backoff.
+    sched = AdaptiveScheduler(min_interval=MIN_INTERVAL_S, max_concurrency=1, latency_target=30.0)
 
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=not args.headful)
@@ -135,13 +143,14 @@ def main():
         page = context.new_page()
 
         for idv, name in ids:
-            row = download_one(page, outdir, idv, name, args.year)
+            row = download_one(page, sched, outdir, idv, name, args.year)
             print(f"[{row['status'].upper()}] {idv} {name} -> {row.get('filename', row.get('error'))}")
             manifest.append(row)
 
         context.close()
         browser.close()
 
+    print(f"Scheduler: {sched.summary()}")
     mpath = Path("out/download_manifest.json")
     mpath.write_text(json.dumps(manifest, indent=2))
     print(f"\nWrote manifest: {mpath}")
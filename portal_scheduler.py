@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Adaptive request scheduler shared by the portal downloaders.
+
+Tracks response latency and 429/5xx rates and adjusts pacing + concurrency
+AIMD-style:
+  - healthy responses   -> additive increase (one more slot per window, shorter gap)
+  - 429 / 5xx / slow    -> multiplicative decrease (halve slots, double gap)
+  - Retry-After         -> honoured as a hard floor before the next request
+  - N hard failures     -> circuit breaker opens; callers block until the cooldown
+                           passes, then a single half-open probe decides. Once it
+                           has opened `breaker_max_trips` times without a good
+                           probe, acquire() raises CircuitOpen: give up the run.
+
+Fetch callables report an HTTP status (or None for a network error):
+  - None / 5xx  -> hard failure: retried, feeds the circuit breaker
+  - 429 / 503   -> throttle: retried, slows the pace
+  - 408         -> client-side timeout: retried; neither speeds up nor slows the pace
+  - other 4xx   -> returned at once; retrying will not help
+Only status < 400 counts as healthy and grows concurrency. Any answer that is
+not a failure (2xx-4xx) proves the portal is reachable, so it closes the
+breaker when it arrives as the half-open probe.
+
+Usage:
+  sched = AdaptiveScheduler(min_interval=0.5, max_concurrency=4)
+  status = sched.call(lambda: fetch(url))   # fetch returns (status, retry_after)
+"""
+from __future__ import annotations
+import random, threading, time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional, Tuple
+
+# fetch callable -> (HTTP status or None on network error, Retry-After header or None)
+FetchResult = Tuple[Optional[int], Optional[str]]
+
+
+class CircuitOpen(RuntimeError):
+    """Raised when the breaker keeps re-opening and the portal should be left alone."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP-date; return seconds to wait."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_throttle(status: Optional[int]) -> bool:
+    return status == 429 or status == 503
+
+
+def is_failure(status: Optional[int]) -> bool:
+    return status is None or status >= 500
+
+
+def is_retryable(status: Optional[int]) -> bool:
+    return is_throttle(status) or is_failure(status) or status == 408
+
+
+class AdaptiveScheduler:
+    def __init__(self,
+                 min_interval: float = 0.5,
+                 max_interval: float = 30.0,
+                 max_concurrency: int = 4,
+                 latency_target: float = 3.0,
+                 base_backoff: float = 1.0,
+                 max_backoff: float = 60.0,
+                 breaker_threshold: int = 5,
+                 breaker_cooldown: float = 120.0,
+                 breaker_max_trips: int = 3,
+                 interval_step: float = 0.25,
+                 verbose: bool = True):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_concurrency = max(1, max_concurrency)
+        self.latency_target = latency_target
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.breaker_max_trips = breaker_max_trips
+        self.interval_step = interval_step
+        self.verbose = verbose
+
+        # Start conservatively: one slot at the configured pace, grow from there.
+        self.limit = 1.0
+        self.interval = min_interval
+        self.in_flight = 0
+        self.next_start = 0.0          # monotonic time before which no request may start
+        self.consecutive_failures = 0
+        self.open_until = 0.0          # breaker open while monotonic() < open_until
+        self.probing = False           # half-open probe in flight
+        self.trips = 0                 # consecutive breaker openings without a successful probe
+        self.stats = {"ok": 0, "throttled": 0, "failed": 0, "slow": 0, "timeout": 0, "client_error": 0}
+        self._cv = threading.Condition()
+
+    def _log(self, msg: str):
+        if self.verbose:
+            print(f"  [sched] {msg}")
+
+    # ---- slot management ----
+
+    def acquire(self):
+        """
+        Block until a slot is free and pacing allows a start. While the breaker is
+        open this waits out the cooldown; raises CircuitOpen once it has tripped
+        `breaker_max_trips` times in a row.
+        """
+        with self._cv:
+            while True:
+                now = time.monotonic()
+                if self.trips >= self.breaker_max_trips:
+                    raise CircuitOpen(f"portal still failing after {self.trips} circuit openings; giving up")
+                if now < self.open_until:
+                    self._cv.wait(self.open_until - now)
+                    continue
+                half_open = self.open_until > 0
+                if half_open and self.probing:
+                    self._cv.wait(1.0)
+                    continue
+                if self.in_flight >= int(self.limit):
+                    self._cv.wait()
+                    continue
+                if now < self.next_start:
+                    self._cv.wait(self.next_start - now)
+                    continue
+                if half_open:
+                    self.probing = True
+                self.in_flight += 1
+                self.next_start = now + self.interval
+                return
+
+    def release(self, status: Optional[int], latency: float, retry_after: Optional[str] = None):
+        """Record one response and adjust limit/interval/breaker accordingly."""
+        with self._cv:
+            self.in_flight -= 1
+            now = time.monotonic()
+            wait = parse_retry_after(retry_after)
+            if wait is not None:
+                self.next_start = max(self.next_start, now + min(wait, self.max_backoff))
+
+            if is_throttle(status) or is_failure(status):
+                self.stats["throttled" if is_throttle(status) else "failed"] += 1
+                self._decrease()
+            elif status == 408:
+                self.stats["timeout"] += 1      # our own click/render timeout: no signal either way
+            elif status >= 400:
+                self.stats["client_error"] += 1
+            elif latency > self.latency_target:
+                self.stats["slow"] += 1
+                self._decrease()
+            else:
+                self.stats["ok"] += 1
+                self._increase()
+
+            if is_failure(status):
+                self.consecutive_failures += 1
+            else:
+                self.consecutive_failures = 0
+
+            if self.probing:
+                self.probing = False
+                # The portal answered (even a 4xx) unless the probe itself failed.
+                if is_failure(status):
+                    self._trip(now)
+                else:
+                    self.open_until = 0.0
+                    self.trips = 0
+                    self._log("circuit closed")
+            elif self.open_until == 0 and self.consecutive_failures >= self.breaker_threshold:
+                self._trip(now)
+            self._cv.notify_all()
+
+    def _increase(self):
+        self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+        self.interval = max(self.min_interval, self.interval - self.interval_step)
+
+    def _decrease(self):
+        self.limit = max(1.0, self.limit / 2)
+        self.interval = min(self.max_interval, max(self.interval * 2, self.interval_step))
+
+    def _trip(self, now: float):
+        self.open_until = now + self.breaker_cooldown
+        self.limit = 1.0
+        self.trips += 1
+        self._log(f"circuit OPEN after {self.consecutive_failures} failures; cooling down {self.breaker_cooldown:.0f}s")
+
+    # ---- retries ----
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given 1-based attempt."""
+        cap = min(self.max_backoff, self.base_backoff * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    def call(self, fetch: Callable[[], FetchResult], retries: int = 3) -> Optional[int]:
+        """
+        Run fetch() under the scheduler, retrying throttles/failures with jittered
+        backoff (or Retry-After when given). Returns the last status seen.
+        Non-retryable statuses (4xx other than 408/429) are returned immediately.
+        """
+        status: Optional[int] = None
+        for attempt in range(1, retries + 1):
+            self.acquire()
+            t0 = time.monotonic()
+            status, retry_after = None, None
+            try:
+                status, retry_after = fetch()
+            finally:
+                self.release(status, time.monotonic() - t0, retry_after)
+            if status is not None and status < 400:
+                return status
+            if not is_retryable(status) or attempt == retries:
+                return status
+            delay = parse_retry_after(retry_after)
+            if delay is None:
+                delay = self.backoff(attempt)
+            self._log(f"status={status}; retry {attempt}/{retries - 1} in {delay:.1f}s")
+            time.sleep(min(delay, self.max_backoff))
+        return status
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"ok={s['ok']} throttled={s['throttled']} failed={s['failed']} slow={s['slow']} "
+                f"timeout={s['timeout']} client_error={s['client_error']} "
+                f"final_concurrency={int(self.limit)} final_interval={self.interval:.2f}s")
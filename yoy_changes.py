@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Year-over-year change table across statewide ratings masters.
+
+Aligns schools across any number of years once (one key index over
+district_code + school_code, normalised like make_enrollment_preview.py:
+leading zeros stripped, school decimal suffix kept verbatim), then computes every
+consecutive-year delta/transition with column operations on the aligned arrays.
+
+Usage:
+  python yoy_changes.py                       # all data/*/SchoolRatings_MASTER_*.csv
+  python yoy_changes.py --masters data/2023-24/SchoolRatings_MASTER_2023-24.csv data/2024-25/SchoolRatings_MASTER_2024-25.csv
+
+Output (tidy, one row per school x year pair x metric):
+  district_code, school_code, district_name, school_name, from_year, to_year,
+  metric, from_value, to_value, delta, transition
+
+from_value/to_value are the cells exactly as published, so suppression markers
+('<5', '-', ...) stay visible; delta is computed only when both sides are numeric
+and is blank otherwise.
+
+Results are cached under out/cache/yoy/ keyed by the SHA256 of the inputs;
+re-running on unchanged masters just copies the cached table.
+"""
+import argparse, hashlib, json, re, shutil
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ENGINE_VERSION = 3  # bump when the output layout/logic changes to invalidate caches
+
+NUMERIC_METRICS = [
+    "Total Index Score",
+    "% Proficient ELA",
+    "% Proficient Math",
+    "% Proficient Science",
+    "Chronic Absenteeism",
+]
+STAR_METRIC = "Star Rating"
+DESIGNATIONS = ["CSI", "TSI", "ATSI"]
+OUT_COLS = ["district_code", "school_code", "district_name", "school_name", "from_year", "to_year",
+            "metric", "from_value", "to_value", "delta", "transition"]
+
+def sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1<<20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def label_from_name(path: Path) -> str:
+    m = re.search(r"(\d{4}-\d{2})", path.name)
+    if not m:
+        raise SystemExit(f"Cannot infer year label from {path.name}")
+    return m.group(1)
+
+def load_master(path: Path) -> pd.DataFrame:
+    df = pd.read_csv(path, dtype=str)
+    # Same key rules as make_enrollment_preview.py: "02" -> "2", "01205.1" -> "1205.1"
+    df["district_code"] = (df["District Code"].str.replace(r"[^\d]", "", regex=True)
+                           .str.replace(r"^0+(?=\d)", "", regex=True))
+    df["school_code"] = (df["NSPF School Code"].str.strip()  # keep decimals (1301.2)
+                         .str.replace(r"^0+(?=\d)", "", regex=True))
+    blank = df["district_code"].fillna("").eq("") | df["school_code"].fillna("").eq("")
+    if blank.any():
+        print(f"[WARN] {path.name}: {blank.sum()} rows missing District Code/NSPF School Code; dropped")
+        df = df[~blank]
+    df["_key"] = df["district_code"] + "|" + df["school_code"]
+    dups = df["_key"].duplicated()
+    if dups.any():
+        print(f"[WARN] {path.name}: {dups.sum()} duplicate district/school keys; keeping first")
+        df = df[~dups]
+    return df
+
+class KeyIndex:
+    """One factorized key space shared by every year; rows map to positions once."""
+    def __init__(self, frames):
+        codes, self.keys = pd.factorize(pd.concat([f["_key"] for f in frames], ignore_index=True))
+        self.pos = np.split(codes, np.cumsum([len(f) for f in frames])[:-1])
+        self.n = len(self.keys)
+
+    def align(self, frames, col, numeric=False):
+        """(n_keys, n_years) matrix of `col`; NaN/None where a school is absent that year."""
+        out = np.full((self.n, len(frames)), np.nan, dtype=float if numeric else object)
+        for j, (f, p) in enumerate(zip(frames, self.pos)):
+            if col not in f.columns:
+                continue
+            vals = pd.to_numeric(f[col], errors="coerce").to_numpy(dtype=float) if numeric \
+                else f[col].to_numpy(dtype=object)
+            out[p, j] = vals
+        if not numeric:
+            out[pd.isna(out)] = None
+        return out
+
+def star_transition(a, b):
+    na, nb = pd.to_numeric(pd.Series(a), errors="coerce").to_numpy(), pd.to_numeric(pd.Series(b), errors="coerce").to_numpy()
+    delta = nb - na
+    trans = np.select(
+        [np.isnan(na) & np.isnan(nb), np.isnan(na), np.isnan(nb), delta > 0, delta < 0],
+        ["not rated", "newly rated", "no longer rated", "up", "down"],
+        default="same")
+    return delta, trans
+
+def designation_transition(a, b):
+    ya, yb = (np.asarray(a, dtype=object) == "YES"), (np.asarray(b, dtype=object) == "YES")
+    trans = np.select([ya & yb, yb, ya], ["remained", "entered", "exited"], default="none")
+    return np.full(len(ya), np.nan), trans
+
+def compute_changes(frames, labels) -> pd.DataFrame:
+    idx = KeyIndex(frames)
+    key_parts = pd.Series(idx.keys).str.split("|", n=1, expand=True)
+    # Latest non-missing name wins (names drift year to year)
+    names = {c: pd.DataFrame(idx.align(frames, c)).ffill(axis=1).iloc[:, -1].to_numpy()
+             for c in ("District Name", "School Name")}
+    numeric = {m: idx.align(frames, m, numeric=True) for m in NUMERIC_METRICS}
+    raw = {m: idx.align(frames, m) for m in NUMERIC_METRICS}  # as published, markers kept
+    categorical = {m: idx.align(frames, m) for m in [STAR_METRIC] + DESIGNATIONS}
+    present = np.zeros((idx.n, len(frames)), dtype=bool)
+    for j, p in enumerate(idx.pos):
+        present[p, j] = True
+
+    parts = []
+    for j in range(len(frames) - 1):
+        both = present[:, j] & present[:, j + 1]
+        if not both.any():
+            continue
+        base = {
+            "district_code": key_parts[0].to_numpy()[both],
+            "school_code": key_parts[1].to_numpy()[both],
+            "district_name": names["District Name"][both],
+            "school_name": names["School Name"][both],
+            "from_year": labels[j],
+            "to_year": labels[j + 1],
+        }
+        for m, M in numeric.items():
+            a, b = M[both, j], M[both, j + 1]
+            parts.append(pd.DataFrame({**base, "metric": m,
+                                       "from_value": raw[m][both, j], "to_value": raw[m][both, j + 1],
+                                       "delta": np.round(b - a, 2), "transition": None}))
+        for m, M in categorical.items():
+            a, b = M[both, j], M[both, j + 1]
+            fn = star_transition if m == STAR_METRIC else designation_transition
+            delta, trans = fn(a, b)
+            parts.append(pd.DataFrame({**base, "metric": m, "from_value": a, "to_value": b,
+                                       "delta": delta, "transition": trans}))
+    if not parts:
+        return pd.DataFrame(columns=OUT_COLS)
+    out = pd.concat(parts, ignore_index=True)[OUT_COLS]
+    return out.sort_values(["district_code", "school_code", "from_year", "metric"], kind="stable",
+                           key=lambda s: s.str.zfill(12) if s.name == "district_code" else s)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--masters", nargs="*", help="Ratings master CSVs (default: data/*/SchoolRatings_MASTER_*.csv)")
+    ap.add_argument("--out", default="statewide/yoy_changes.csv")
+    ap.add_argument("--cache-dir", default="out/cache/yoy")
+    ap.add_argument("--force", action="store_true", help="Ignore cached results")
+    args = ap.parse_args()
+
+    paths = [Path(p) for p in args.masters] if args.masters else sorted(Path("data").glob("*/SchoolRatings_MASTER_*.csv"))
+    if len(paths) < 2:
+        raise SystemExit("Need at least two ratings masters to compare")
+    pairs = sorted((label_from_name(p), p) for p in paths)
+    labels = [lbl for lbl, _ in pairs]
+
+    fingerprint = json.dumps({"v": ENGINE_VERSION, "inputs": [[lbl, sha256(p)] for lbl, p in pairs]})
+    cache = Path(args.cache_dir) / f"yoy_{hashlib.sha256(fingerprint.encode()).hexdigest()[:16]}.csv"
+    out = Path(args.out); out.parent.mkdir(parents=True, exist_ok=True)
+    if cache.exists() and not args.force:
+        shutil.copyfile(cache, out)
+        print(f"Wrote {out} (cached: {cache.name})")
+        return
+
+    frames = [load_master(p) for _, p in pairs]
+    table = compute_changes(frames, labels)
+    table.to_csv(out, index=False)
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(out, cache)
+    print(f"Wrote {out}  ({len(table)} rows; {table[['district_code','school_code']].drop_duplicates().shape[0]} schools; years {', '.join(labels)})")
+
+if __name__ == "__main__":
+    main()